@@ -20,7 +20,7 @@ mkdir python
 :: Install dependencies to layer
 echo.
 echo Installing dependencies to layer...
-pip install boto3==1.34.29 -t python
+pip install boto3==1.34.29 "botocore[crt]" orjson rapidfuzz redis --platform manylinux2014_aarch64 --only-binary=:all: -t python
 
 :: Create layer zip
 echo.
@@ -30,7 +30,7 @@ powershell Compress-Archive -Path python -DestinationPath layer.zip -Force
 :: Upload layer to AWS
 echo.
 echo Uploading layer to AWS...
-aws lambda publish-layer-version --layer-name workout-dependencies --description "Dependencies for workout functions" --compatible-runtimes python3.13 --zip-file fileb://layer.zip > layer-response.json
+aws lambda publish-layer-version --layer-name workout-dependencies --description "Dependencies for workout functions" --compatible-runtimes python3.13 --compatible-architectures arm64 --zip-file fileb://layer.zip > layer-response.json
 
 :: Get the Layer ARN from the response
 echo.
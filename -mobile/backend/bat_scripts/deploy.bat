@@ -16,9 +16,9 @@ powershell -Command "Compress-Archive -Path ..\lambdas\parse-workout\lambda_func
 :: Deploy to AWS
 echo.
 echo ===== Deploying to AWS =====
-aws lambda update-function-code --function-name submit-workout --zip-file fileb://submit-workout.zip
-aws lambda update-function-code --function-name get-workouts --zip-file fileb://get-workouts.zip
-aws lambda update-function-code --function-name parse-workout --zip-file fileb://parse-workout.zip
+aws lambda update-function-code --function-name submit-workout --zip-file fileb://submit-workout.zip --architectures arm64
+aws lambda update-function-code --function-name get-workouts --zip-file fileb://get-workouts.zip --architectures arm64
+aws lambda update-function-code --function-name parse-workout --zip-file fileb://parse-workout.zip --architectures arm64
 
 :: Cleanup
 echo.
@@ -30,15 +30,13 @@ Summary Query (default):
                 "date": "YYYY-MM-DD",
                 "workouts": [
                     {
-                        "userId": "string",
                         "workoutId": "string",
                         "exercise": "string",
                         "sets": integer,
                         "reps": integer,
                         "weight": number,
                         "date": "YYYY-MM-DD",
-                        "timestamp": "string",
-                        "userId_exercise": "string"
+                        "timestamp": "string"
                     },
                     ...
                 ]
@@ -129,17 +127,125 @@ Testing & Reliability:
 - Simulate and handle DynamoDB throttling and service failures
 """
 
-import json
+import os
 import logging
-from typing import Dict, Any
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from decimal import Decimal
+from typing import Dict, Any, Optional, Tuple
 import boto3
+import orjson
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
 
-# Set up logging
+try:
+    import redis
+except ImportError:  # redis is only bundled when the cache is deployed
+    redis = None
+
+# Set up logging; production sets LOG_LEVEL=WARNING so hot-path INFO
+# formatting is skipped entirely
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+# Shared client config: TCP keep-alive reuses the TLS session across warm
+# invocations instead of paying a fresh handshake per call. Tight connect
+# timeout fails fast onto the adaptive retry path instead of hanging.
+_BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    connect_timeout=1,
+    read_timeout=10,
+    retries={'mode': 'adaptive', 'max_attempts': 5}
+)
+
+# Low-level client: skips the boto3 Resource layer's per-call attribute
+# lookups and automatic type conversion on the hot query paths
+TABLE_NAME = 'UserWorkouts'
+ddb = boto3.client('dynamodb', config=_BOTO_CONFIG)
+_DESERIALIZER = TypeDeserializer()
+
+def deserialize_items(items: list) -> list:
+    """Convert DynamoDB attribute-value maps into plain Python dicts."""
+    deserialize = _DESERIALIZER.deserialize
+    return [{k: deserialize(v) for k, v in item.items()} for item in items]
+
+# Attributes the UI actually consumes - projecting these cuts RCUs and
+# network bytes compared to pulling every attribute across the wire.
+# 'date', 'timestamp' and 'sets' are reserved words in DynamoDB, hence the aliases.
+WORKOUT_PROJECTION = 'workoutId, exercise, weight, reps, #s, #d, #ts'
+WORKOUT_PROJECTION_NAMES = {'#d': 'date', '#ts': 'timestamp', '#s': 'sets'}
+PROGRESS_PROJECTION = '#d, weight, reps, #s, exercise, workoutId'
+PROGRESS_PROJECTION_NAMES = {'#d': 'date', '#s': 'sets'}
+
+# Newest entries the exercise/progress endpoints return by default; the UI
+# charts recent history, so there is no need to download a user's entire
+# exercise log unless they explicitly ask for it (?full=1)
+DEFAULT_EXERCISE_LIMIT = 200
+
+# Shared pool for running independent DynamoDB queries concurrently
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Optional ElastiCache read-through cache for summary/progress queries.
+# Enabled by setting ELASTICACHE_ENDPOINT on the function; reads hit Redis
+# in ~100us vs several ms for a DynamoDB query.
+CACHE_TTL_SECONDS = int(os.environ.get('CACHE_TTL_SECONDS', '60'))
+_cache = None
+if redis is not None and os.environ.get('ELASTICACHE_ENDPOINT'):
+    _cache = redis.Redis(
+        host=os.environ['ELASTICACHE_ENDPOINT'],
+        port=int(os.environ.get('ELASTICACHE_PORT', '6379')),
+        socket_connect_timeout=0.5,
+        socket_timeout=0.5
+    )
+
+def _json_default(obj: Any) -> Any:
+    """Serialize DynamoDB Decimals as floats for cache payloads."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Fetch a cached result, treating any cache failure as a miss."""
+    if _cache is None:
+        return None
+    try:
+        payload = _cache.get(key)
+        return orjson.loads(payload) if payload else None
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning("Cache read failed for %s: %s", key, str(e))
+        return None
+
+def cache_set(key: str, result: Dict[str, Any]) -> None:
+    """Store a result with a short TTL; failures are non-fatal."""
+    if _cache is None:
+        return
+    try:
+        _cache.setex(key, CACHE_TTL_SECONDS, orjson.dumps(result, default=_json_default))
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning("Cache write failed for %s: %s", key, str(e))
+
+# Warm-up state - set True after the first invocation has primed the client
+_WARM = False
+
+def _warm() -> None:
+    """
+    Prime the DynamoDB client so the first real request doesn't pay
+    TLS handshake latency. Only runs once per container.
+    """
+    global _WARM  # pylint: disable=global-statement
+    try:
+        # Cheap metadata call that forces connection establishment
+        ddb.describe_endpoints()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning("Client warm-up failed: %s", str(e))
+    _WARM = True
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('UserWorkouts')
+# Opt-in eager warm-up: the INIT phase runs at full CPU and is billed
+# separately, so paying the TLS handshake at import keeps it off the
+# first invocation's critical path
+if os.environ.get('EAGER_INIT', '').lower() in ('1', 'true'):
+    _warm()
 
 def get_workouts_by_date(user_id: str, date: str) -> Dict[str, Any]:
     """
@@ -153,25 +259,27 @@ def get_workouts_by_date(user_id: str, date: str) -> Dict[str, Any]:
         Dict with status code and workouts data
     """
     try:
-        # Query using GSI1 (DateIndex)
-        response = table.query(
+        # Query using GSI1 (DateIndex), pulling only the attributes the UI uses
+        response = ddb.query(
+            TableName=TABLE_NAME,
             IndexName='DateIndex',
-            KeyConditionExpression='userId = :uid AND #date = :date',
-            ExpressionAttributeNames={
-                '#date': 'date'  # 'date' is a reserved word in DynamoDB
-            },
+            KeyConditionExpression='userId = :uid AND #d = :date',
+            ProjectionExpression=WORKOUT_PROJECTION,
+            ExpressionAttributeNames=WORKOUT_PROJECTION_NAMES,
             ExpressionAttributeValues={
-                ':uid': user_id,
-                ':date': date
+                ':uid': {'S': user_id},
+                ':date': {'S': date}
             }
         )
-        logger.info("Retrieved %s workouts for user %s on %s",
-                   len(response.get('Items', [])), user_id, date)
+        workouts = deserialize_items(response.get('Items', []))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Retrieved %s workouts for user %s on %s",
+                       len(workouts), user_id, date)
         return {
             'statusCode': 200,
             'body': {
                 'date': date,
-                'workouts': response.get('Items', [])
+                'workouts': workouts
             }
         }
     except Exception as e:  # pylint: disable=broad-exception-caught
@@ -181,14 +289,20 @@ def get_workouts_by_date(user_id: str, date: str) -> Dict[str, Any]:
             'body': {'error': f"Error retrieving workouts: {str(e)}"}
         }
 
-def get_workouts_by_exercise(user_id: str, exercise: str) -> Dict[str, Any]:
+def get_workouts_by_exercise(user_id: str, exercise: str,
+                             progress_only: bool = False,
+                             limit: Optional[int] = DEFAULT_EXERCISE_LIMIT) -> Dict[str, Any]:
     """
-    Get all workouts for a specific exercise, sorted by timestamp.
-    
+    Get workouts for a specific exercise, sorted by timestamp.
+
     Args:
         user_id: The user's unique identifier
         exercise: Name of the exercise
-        
+        progress_only: When True, project only the attributes needed for
+            progress charting (date, weight, reps, sets)
+        limit: Cap on items returned (newest first); None fetches the
+            full history
+
     Returns:
         Dict with status code and workouts data
     """
@@ -196,23 +310,38 @@ def get_workouts_by_exercise(user_id: str, exercise: str) -> Dict[str, Any]:
         # Create the userId_exercise key
         user_id_exercise = f"{user_id}#EXERCISE#{exercise}"
 
+        if progress_only:
+            projection = PROGRESS_PROJECTION
+            projection_names = PROGRESS_PROJECTION_NAMES
+        else:
+            projection = WORKOUT_PROJECTION
+            projection_names = WORKOUT_PROJECTION_NAMES
+
         # Query using GSI2 (ExerciseIndex)
-        response = table.query(
-            IndexName='ExerciseIndex',
-            KeyConditionExpression='userId_exercise = :uex',
-            ExpressionAttributeValues={
-                ':uex': user_id_exercise
+        query_kwargs = {
+            'TableName': TABLE_NAME,
+            'IndexName': 'ExerciseIndex',
+            'KeyConditionExpression': 'userId_exercise = :uex',
+            'ProjectionExpression': projection,
+            'ExpressionAttributeNames': projection_names,
+            'ExpressionAttributeValues': {
+                ':uex': {'S': user_id_exercise}
             },
-            ScanIndexForward=False  # Sort in descending order (newest first)
-        )
-
-        logger.info("Retrieved %s %s workouts for user %s",
-                   len(response.get('Items', [])), exercise, user_id)
+            'ScanIndexForward': False  # Sort in descending order (newest first)
+        }
+        if limit is not None:
+            query_kwargs['Limit'] = limit
+        response = ddb.query(**query_kwargs)
+        workouts = deserialize_items(response.get('Items', []))
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Retrieved %s %s workouts for user %s",
+                       len(workouts), exercise, user_id)
         return {
             'statusCode': 200,
             'body': {
                 'exercise': exercise,
-                'workouts': response.get('Items', [])
+                'workouts': workouts
             }
         }
     except Exception as e:  # pylint: disable=broad-exception-caught
@@ -233,36 +362,43 @@ def get_user_workout_summary(user_id: str) -> Dict[str, Any]:
         Dict with status code and summary data
     """
     try:
-        # Query all workouts for this user using DateIndex for faster retrieval
-        response = table.query(
-            IndexName='DateIndex',
-            KeyConditionExpression='userId = :uid',
-            ExpressionAttributeValues={
-                ':uid': user_id
+        # Query all workouts for this user using DateIndex for faster retrieval.
+        # DynamoDB caps each response at 1 MB, so follow LastEvaluatedKey to
+        # avoid silently truncating users with a long history.
+        query_kwargs = {
+            'TableName': TABLE_NAME,
+            'IndexName': 'DateIndex',
+            'KeyConditionExpression': 'userId = :uid',
+            'ProjectionExpression': WORKOUT_PROJECTION,
+            'ExpressionAttributeNames': WORKOUT_PROJECTION_NAMES,
+            'ExpressionAttributeValues': {
+                ':uid': {'S': user_id}
             }
-        )
+        }
 
-        # Group workouts by date
-        workouts_by_date = {}
-        for item in response.get('Items', []):
-            date = item.get('date')
-            if date not in workouts_by_date:
-                workouts_by_date[date] = []
-            workouts_by_date[date].append(item)
+        # Group workouts by date - defaultdict does one hash lookup per item
+        workouts_by_date = defaultdict(list)
+        while True:
+            response = ddb.query(**query_kwargs)
+            for item in deserialize_items(response.get('Items', [])):
+                workouts_by_date[item.get('date')].append(item)
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                break
+            query_kwargs['ExclusiveStartKey'] = last_key
 
         # Sort dates in descending order (newest first)
-        sorted_dates = sorted(workouts_by_date.keys(), reverse=True)
+        sorted_dates = sorted(workouts_by_date, reverse=True)
 
         # Build the response
-        workout_summary = []
-        for date in sorted_dates:
-            workout_summary.append({
-                'date': date,
-                'workouts': workouts_by_date[date]
-            })
+        workout_summary = [
+            {'date': date, 'workouts': workouts_by_date[date]}
+            for date in sorted_dates
+        ]
 
-        logger.info("Retrieved workout summary for user %s (%s days)",
-                   user_id, len(workout_summary))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Retrieved workout summary for user %s (%s days)",
+                       user_id, len(workout_summary))
         return {
             'statusCode': 200,
             'body': {
@@ -277,21 +413,62 @@ def get_user_workout_summary(user_id: str) -> Dict[str, Any]:
             'body': {'error': f"Error retrieving workout summary: {str(e)}"}
         }
 
-def get_exercise_progress(user_id: str, exercise: str) -> Dict[str, Any]:
+def query_max_weight(user_id: str, exercise: str) -> Optional[Tuple[float, str]]:
+    """
+    Look up a user's max weight for an exercise via the MaxWeightIndex GSI.
+
+    The index is keyed on userId_exercise with weight as the sort key, so a
+    single Limit=1 descending query answers the question in O(1) RCUs
+    instead of downloading the whole exercise history.
+
+    Args:
+        user_id: The user's unique identifier
+        exercise: Name of the exercise
+
+    Returns:
+        Tuple of (max_weight, date) or None if the index is unavailable
+    """
+    try:
+        response = ddb.query(
+            TableName=TABLE_NAME,
+            IndexName='MaxWeightIndex',
+            KeyConditionExpression='userId_exercise = :uex',
+            ExpressionAttributeValues={
+                ':uex': {'S': f"{user_id}#EXERCISE#{exercise}"}
+            },
+            ScanIndexForward=False,
+            Limit=1
+        )
+        items = deserialize_items(response.get('Items', []))
+        if items:
+            return float(items[0].get('weight') or 0), items[0].get('date', '')
+        return None
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # Tables without the GSI fall back to the in-pass max computation
+        logger.warning("MaxWeightIndex query failed: %s", str(e))
+        return None
+
+def get_exercise_progress(user_id: str, exercise: str,
+                          limit: Optional[int] = DEFAULT_EXERCISE_LIMIT) -> Dict[str, Any]:
     """
     Get a user's progress on a specific exercise over time.
     Returns data formatted for charting/visualization.
-    
+
     Args:
         user_id: The user's unique identifier
         exercise: Name of the exercise
-        
+        limit: Newest entries to chart; None charts the full history
+
     Returns:
         Dict with status code and progress data
     """
     try:
-        # Get all workouts for this exercise
-        result = get_workouts_by_exercise(user_id, exercise)
+        # Kick off the max-weight lookup concurrently with the history query
+        max_weight_future = _EXECUTOR.submit(query_max_weight, user_id, exercise)
+
+        # Get recent workouts for this exercise, projecting only charting fields
+        result = get_workouts_by_exercise(user_id, exercise,
+                                          progress_only=True, limit=limit)
 
         if result.get('statusCode') != 200 or not result.get('body', {}).get('workouts'):
             return {
@@ -305,34 +482,46 @@ def get_exercise_progress(user_id: str, exercise: str) -> Dict[str, Any]:
 
         workouts = result.get('body', {}).get('workouts', [])
 
-        # Format data for visualization (extract dates and weights)
+        # Format data for visualization, tracking the max weight in the same
+        # pass instead of re-scanning the finished list
         progress_data = []
+        max_weight = 0
+        max_weight_date = ''
         for workout in workouts:
+            date = workout.get('date')
+            weight = float(workout.get('weight') or 0)
+            reps = int(workout.get('reps') or 0)
+            sets = int(workout.get('sets') or 0)
             progress_data.append({
-                'date': workout.get('date'),
-                'weight': float(workout.get('weight', 0)),
-                'reps': int(workout.get('reps', 0)),
-                'sets': int(workout.get('sets', 0)),
+                'date': date,
+                'weight': weight,
+                'reps': reps,
+                'sets': sets,
                 # Add a simple volume calculation
-                'volume': float(workout.get('weight', 0)) * 
-                          int(workout.get('reps', 0)) *
-                          int(workout.get('sets', 0))
+                'volume': weight * reps * sets
             })
-
-        # Sort by date (ascending)
-        progress_data.sort(key=lambda x: x.get('date', ''))
-
-        # Get max weight and date achieved
-        if progress_data:
-            max_weight_workout = max(progress_data, key=lambda x: x.get('weight', 0))
-            max_weight = max_weight_workout.get('weight', 0)
-            max_weight_date = max_weight_workout.get('date', '')
-        else:
-            max_weight = 0
-            max_weight_date = ''
-
-        logger.info("Retrieved progress data for %s for user %s",
-                   exercise, user_id)
+            if weight > max_weight:
+                max_weight = weight
+                max_weight_date = date
+
+        # ExerciseIndex returned newest-first; reverse to get ascending dates
+        # without a comparison sort
+        progress_data.reverse()
+
+        # Prefer the indexed answer when the GSI is available; a stalled
+        # lookup must not hold the response hostage when the in-pass max
+        # computed above is already good enough
+        try:
+            indexed_max = max_weight_future.result(timeout=2)
+        except FuturesTimeoutError:
+            logger.warning("MaxWeightIndex lookup timed out; using in-pass max")
+            indexed_max = None
+        if indexed_max is not None:
+            max_weight, max_weight_date = indexed_max
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Retrieved progress data for %s for user %s",
+                       exercise, user_id)
         return {
             'statusCode': 200,
             'body': {
@@ -365,23 +554,40 @@ def lambda_handler(event: Dict[str, Any], _: Any) -> Dict[str, Any]:
         Response with status code and body
     """
     try:
+        # Prime the DynamoDB client on the first invocation of a fresh container
+        if not _WARM and 'AWS_LAMBDA_FUNCTION_NAME' in os.environ:
+            _warm()
+
         # Get parameters from event
         if isinstance(event.get('body'), str):
-            body = json.loads(event.get('body', '{}'))
+            try:
+                body = orjson.loads(event.get('body', '{}'))
+            except orjson.JSONDecodeError:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': orjson.dumps({'error': 'Invalid JSON in request body'}).decode()
+                }
         else:
             body = event.get('body', {})
         query_params = event.get('queryStringParameters', {}) or {}
 
-        # Extract parameters from body or query params
-        user_id = body.get('user_id') or query_params.get('user_id')
+        # Extract parameters from body or query params; the API documents
+        # userId, but user_id is still accepted for older callers
+        user_id = (body.get('userId') or body.get('user_id')
+                   or query_params.get('userId') or query_params.get('user_id'))
         date = body.get('date') or query_params.get('date')
         exercise = body.get('exercise') or query_params.get('exercise')
         query_type = body.get('query_type') or query_params.get('query_type') or 'summary'
 
-        logger.info(
-            "Received request: query_type=%s, user_id=%s, date=%s, exercise=%s",
-            query_type, user_id, date, exercise
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Received request: query_type=%s, user_id=%s, date=%s, exercise=%s",
+                query_type, user_id, date, exercise
+            )
 
         if not user_id:
             return {
@@ -390,19 +596,46 @@ def lambda_handler(event: Dict[str, Any], _: Any) -> Dict[str, Any]:
                     'Content-Type': 'application/json',
                     'Access-Control-Allow-Origin': '*'
                 },
-                'body': json.dumps({'error': 'user_id is required'})
+                'body': orjson.dumps({'error': 'user_id is required'}).decode()
             }
 
-        # Route to appropriate function based on query type
+        # ?window=N returns the newest N entries; ?full=1 disables the cap.
+        # Applies to both the exercise and progress routes.
+        window = body.get('window') or query_params.get('window')
+        full = str(body.get('full') or query_params.get('full') or '').lower() in ('1', 'true')
+        if full:
+            limit = None
+        elif window:
+            limit = int(window)
+        else:
+            limit = DEFAULT_EXERCISE_LIMIT
+
+        # Route to appropriate function based on query type; summary and
+        # progress results are served read-through from the cache when enabled
         match query_type:
             case 'date' if date:
                 result = get_workouts_by_date(user_id, date)
             case 'exercise' if exercise:
-                result = get_workouts_by_exercise(user_id, exercise)
+                result = get_workouts_by_exercise(user_id, exercise, limit=limit)
             case 'progress' if exercise:
-                result = get_exercise_progress(user_id, exercise)
+                if limit == DEFAULT_EXERCISE_LIMIT:
+                    # Only the default window is cached, keeping the key
+                    # space aligned with the writer-side invalidation
+                    cache_key = f"prog:{user_id}:{exercise}"
+                    result = cache_get(cache_key)
+                    if result is None:
+                        result = get_exercise_progress(user_id, exercise)
+                        if result.get('statusCode') == 200:
+                            cache_set(cache_key, result)
+                else:
+                    result = get_exercise_progress(user_id, exercise, limit=limit)
             case _:  # default
-                result = get_user_workout_summary(user_id)
+                cache_key = f"sum:{user_id}"
+                result = cache_get(cache_key)
+                if result is None:
+                    result = get_user_workout_summary(user_id)
+                    if result.get('statusCode') == 200:
+                        cache_set(cache_key, result)
 
         # Add CORS headers
         if isinstance(result, dict) and 'statusCode' in result:
@@ -410,9 +643,10 @@ def lambda_handler(event: Dict[str, Any], _: Any) -> Dict[str, Any]:
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             }
-            # Ensure body is a string (JSON)
+            # Ensure body is a string (JSON); DynamoDB Decimals serialize
+            # through the same default hook the cache uses
             if isinstance(result.get('body'), dict):
-                result['body'] = json.dumps(result['body'])
+                result['body'] = orjson.dumps(result['body'], default=_json_default).decode()
 
         return result
 
@@ -424,5 +658,5 @@ def lambda_handler(event: Dict[str, Any], _: Any) -> Dict[str, Any]:
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({'error': 'Internal server error'})
+            'body': orjson.dumps({'error': 'Internal server error'}).decode()
         }
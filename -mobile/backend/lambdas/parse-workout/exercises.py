@@ -5,6 +5,9 @@ NOTES FOR AI MODELS:
 include bodyweight workouts in the catagory with the muscle worked in order to avoid duplicate entries.
 """
 
+import sys
+from collections import defaultdict
+
 KNOWN_EXERCISES = {
     # Upper Body - Push
     "bench press",
@@ -63,4 +66,19 @@ KNOWN_EXERCISES = {
     "dip",
     "lunge",
     "burpee"
-}
\ No newline at end of file
+}
+
+# Interned frozenset: membership checks on interned strings short-circuit
+# to a pointer compare, and each name is stored exactly once per container
+KNOWN_EXERCISES = frozenset(sys.intern(name) for name in KNOWN_EXERCISES)
+
+# Stable ordering for fuzzy matching when the token index has no candidates
+EXERCISES_LIST = tuple(sorted(KNOWN_EXERCISES))
+
+# Inverted index mapping each word ("press", "squat", ...) to the exercises
+# containing it, so fuzzy matching only scores a handful of candidates
+# instead of the whole catalog
+TOKEN_INDEX = defaultdict(list)
+for _exercise in EXERCISES_LIST:
+    for _token in _exercise.split():
+        TOKEN_INDEX[_token].append(_exercise)
\ No newline at end of file
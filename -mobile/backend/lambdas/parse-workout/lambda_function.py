@@ -96,32 +96,306 @@ Testing & Reliability:
 - Implement proper error recovery
 """
 
-import json
-import re
-import difflib
+import hashlib
+import os
+import sys
 import time
 import logging
-from decimal import Decimal
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
 import boto3
-from exercises import KNOWN_EXERCISES
-
-# Set up logging
+import orjson
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
+from exercises import KNOWN_EXERCISES, TOKEN_INDEX
+
+try:
+    import redis
+except ImportError:  # redis is only bundled when the cache is deployed
+    redis = None
+
+# Set up logging; production sets LOG_LEVEL=WARNING so hot-path INFO
+# formatting is skipped entirely
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+# Shared client config: TCP keep-alive reuses the TLS session across warm
+# invocations instead of paying a fresh handshake per call. Tight connect
+# timeout fails fast onto the adaptive retry path instead of hanging.
+_BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    connect_timeout=1,
+    read_timeout=10,
+    retries={'mode': 'adaptive', 'max_attempts': 5}
+)
+
+# Initialize AWS clients. The low-level DynamoDB client with explicit
+# attribute-value marshalling skips the Resource layer's per-call
+# introspection and type conversion on the hot save/query paths.
+TABLE_NAME = 'UserWorkouts'
+bedrock = boto3.client('bedrock-runtime', config=_BOTO_CONFIG)
+ddb = boto3.client('dynamodb', config=_BOTO_CONFIG)
+_DESERIALIZER = TypeDeserializer()
+
+# Frozen once at import so every invocation reuses the same sequence
+# instead of difflib materializing the set into a list per call
+_KNOWN_EXERCISES_TUPLE = tuple(KNOWN_EXERCISES)
+
+# First words of known exercises, used to spot obvious non-workout
+# chatter before paying for a Bedrock call
+_KNOWN_SUBSTRINGS = frozenset(name.split()[0] for name in KNOWN_EXERCISES)
+
+# Quantum for weight values; quantize skips the float->str->Decimal round-trip
+TWO_PLACES = Decimal('0.01')
+
+# Retry schedule for BatchWriteItem leftovers
+MAX_BATCH_ATTEMPTS = 5
+
+# Haiku is markedly faster and cheaper than the deprecated Instant v1
+MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+
+# Forced tool use makes Claude return structured JSON directly, so the
+# happy path never parses model text at all
+_WORKOUT_TOOL = {
+    'name': 'record_workout',
+    'description': 'Record the workouts described in the message.',
+    'input_schema': {
+        'type': 'object',
+        'properties': {
+            'workouts': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'exercise': {
+                            'type': 'string',
+                            'description': 'Exercise name in UPPERCASE'
+                        },
+                        'sets': {'type': ['integer', 'null']},
+                        'reps': {'type': ['integer', 'null']},
+                        'weight': {
+                            'type': ['number', 'null'],
+                            'description': 'Weight in pounds; 0 for bodyweight'
+                        },
+                    },
+                    'required': ['exercise', 'sets', 'reps', 'weight'],
+                },
+            },
+        },
+        'required': ['workouts'],
+    },
+}
+
+# Static instructions, hoisted so the object identity (and token prefix)
+# is stable across invocations - a requirement for prompt cache hits
+INSTRUCTIONS = (
+    "Extract workout information from this text. Return ONLY a JSON object with these fields:\n"
+    "{\n"
+    "  \"exercise\": \"EXERCISE NAME IN UPPERCASE\",\n"
+    "  \"sets\": number or null,\n"
+    "  \"reps\": number or null,\n"
+    "  \"weight\": number in pounds or null\n"
+    "}\n"
+    "If the text describes MULTIPLE exercises, return a JSON array of such objects instead.\n"
+    "If a field is missing or unclear, use null.\n"
+    "IMPORTANT: The exercise name MUST be in UPPERCASE letters.\n"
+    "For bodyweight/calisthenics exercises, set weight to 0.\n"
+    "Unless otherwise specified, the format the user says their info is weight, reps, sets.\n"
+)
+
+# Request skeleton for invoke_model; copied and completed per call so the
+# constant fields are never rebuilt. The instructions live in a system
+# block marked ephemeral: Bedrock caches the prefilled prefix, so repeat
+# calls skip most of the input-token cost and prefill latency.
+_BODY_TEMPLATE = {
+    "anthropic_version": "bedrock-2023-05-31",
+    "max_tokens": 512,
+    "temperature": 0,
+    "system": [{
+        "type": "text",
+        "text": INSTRUCTIONS,
+        "cache_control": {"type": "ephemeral"},
+    }],
+    "tools": [_WORKOUT_TOOL],
+    "tool_choice": {"type": "tool", "name": "record_workout"},
+}
+
+# Fixed error payloads, serialized once at import; every error return
+# reuses the bytes instead of re-dumping an identical dict
+_ERR_MESSAGE_REQUIRED = orjson.dumps({'error': 'Message is required'}).decode()
+_ERR_INTERNAL = orjson.dumps({'error': 'Internal server error'}).decode()
+_ERR_NO_WORKOUT = orjson.dumps({
+    'error': 'Could not extract workout data',
+    'missing_fields': ["exercise", "sets", "reps", "weight"]
+}).decode()
+_ERR_NOT_A_WORKOUT = orjson.dumps({
+    'error': 'Could not extract workout data',
+    'missing_fields': ["exercise", "sets", "reps", "weight"],
+    'message': 'Please describe your workout, e.g. "bench press 135 for 3 sets of 8"'
+}).decode()
+
+# Pool for overlapping DynamoDB IO with the (much longer) Bedrock call
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+# Feature flag: speculatively fetch today's workouts while Claude is
+# generating, so follow-up messages can be checked for duplicate saves
+PREFETCH_RECENT = os.environ.get('PREFETCH_RECENT_WORKOUTS', '').lower() in ('1', 'true')
+
+# Optional Bedrock response cache: repeated messages ("bench 135 3x8")
+# skip the model call entirely. Enabled by pointing PARSE_CACHE_TABLE at
+# a DynamoDB table with a 'ttl' TTL attribute.
+PARSE_CACHE_TABLE = os.environ.get('PARSE_CACHE_TABLE', '')
+PARSE_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+# Feature flag: stream the Bedrock response and stop reading as soon as
+# the first content block completes, instead of buffering the whole body
+BEDROCK_STREAMING = os.environ.get('BEDROCK_STREAMING', '').lower() in ('1', 'true')
+
+# Feature flag: omit userId_exercise so items stay out of ExerciseIndex /
+# MaxWeightIndex entirely (sparse GSI), saving one index write per put.
+# Only safe for deployments that don't serve exercise/progress queries.
+SPARSE_EXERCISE_INDEX = os.environ.get('SPARSE_EXERCISE_INDEX', '').lower() in ('1', 'true')
+
+# Optional ElastiCache connection, shared with get-workouts' read-through
+# cache; writes here must invalidate that cache so reads stay fresh.
+_cache = None
+if redis is not None and os.environ.get('ELASTICACHE_ENDPOINT'):
+    _cache = redis.Redis(
+        host=os.environ['ELASTICACHE_ENDPOINT'],
+        port=int(os.environ.get('ELASTICACHE_PORT', '6379')),
+        socket_connect_timeout=0.5,
+        socket_timeout=0.5
+    )
+
+def parse_cache_key(user_id, message, chat_history):
+    """
+    Derive a stable cache key for a parse request.
+    The message is lowercased with whitespace collapsed so trivial
+    formatting differences still hit the same entry.
+    """
+    normalized = ' '.join(message.lower().split())
+    history_digest = ''
+    if chat_history:
+        history_digest = hashlib.sha256(
+            '|'.join(f"{m.get('role', '')}:{m.get('content', '')}"
+                     for m in chat_history[-5:]).encode()
+        ).hexdigest()
+    return hashlib.sha256(
+        f"{user_id}|{normalized}|{history_digest}".encode()
+    ).hexdigest()
+
+def get_cached_parse(cache_key):
+    """Look up a previously parsed result; any failure is a miss."""
+    try:
+        response = ddb.get_item(
+            TableName=PARSE_CACHE_TABLE,
+            Key={'cacheKey': {'S': cache_key}}
+        )
+        item = response.get('Item')
+        if item:
+            return orjson.loads(item['workouts']['S'])
+        return None
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning("Parse cache read failed: %s", str(e))
+        return None
+
+def put_cached_parse(cache_key, workouts):
+    """Store a successful parse with a TTL; failures are non-fatal."""
+    try:
+        ddb.put_item(
+            TableName=PARSE_CACHE_TABLE,
+            Item={
+                'cacheKey': {'S': cache_key},
+                'workouts': {'S': orjson.dumps(workouts).decode()},
+                'ttl': {'N': str(int(time.time()) + PARSE_CACHE_TTL_SECONDS)},
+            }
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning("Parse cache write failed: %s", str(e))
+
+def invalidate_workout_cache(user_id, exercise):
+    """Drop cached summary/progress entries after a write; non-fatal."""
+    if _cache is None:
+        return
+    try:
+        _cache.delete(f"sum:{user_id}", f"prog:{user_id}:{exercise}")
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning("Cache invalidation failed: %s", str(e))
 
-# Initialize AWS clients
-bedrock = boto3.client('bedrock-runtime')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('UserWorkouts')
+# Warm-up state - set True after the first invocation has primed the clients
+_WARM = False
 
+def _warm():
+    """
+    Prime the DynamoDB and Bedrock clients so the first real request
+    doesn't pay TLS handshake latency. Only runs once per container.
+    """
+    global _WARM  # pylint: disable=global-statement
+    try:
+        # Cheap metadata call that forces connection establishment
+        ddb.describe_endpoints()
+        # Touching the event system forces lazy client initialization
+        _ = bedrock.meta.events
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning("Client warm-up failed: %s", str(e))
+    _WARM = True
+
+# Opt-in eager warm-up: the INIT phase runs at full CPU and is billed
+# separately, so paying the TLS handshakes at import keeps them off the
+# first invocation's critical path
+if os.environ.get('EAGER_INIT', '').lower() in ('1', 'true'):
+    _warm()
+
+@lru_cache(maxsize=1024)
 def map_exercise_name(extracted_name):
-    """Map user input to standardized exercise name."""
-    name = extracted_name.lower().strip()
+    """
+    Map user input to standardized exercise name.
+    Cached on the raw input: the same handful of names ("bench press",
+    "squat") dominate traffic, so warm containers skip fuzzy matching.
+    """
+    # Interning makes the membership check a pointer compare against the
+    # interned KNOWN_EXERCISES entries
+    name = sys.intern(extracted_name.lower().strip())
     if name in KNOWN_EXERCISES:
         return name
-    matches = difflib.get_close_matches(name, KNOWN_EXERCISES, n=1, cutoff=0.8)
-    return matches[0] if matches else name
+    # Trivial variants (plurals, trailing punctuation) are another hash
+    # lookup - only genuinely ambiguous inputs reach the fuzzy matcher
+    cleaned = name.rstrip('s.,!?')
+    if cleaned in KNOWN_EXERCISES:
+        return cleaned
+    # Imported lazily so the exact-match fast path (the common case) never
+    # pays the extension module's load cost during cold start
+    from rapidfuzz import fuzz, process  # pylint: disable=import-outside-toplevel
+
+    # Narrow the fuzzy search to exercises sharing a word with the input
+    # ("incline press" only scores the handful of press variants); fall
+    # back to the full catalog when no token matches
+    candidates = []
+    seen = set()
+    for token in name.split():
+        for exercise in TOKEN_INDEX.get(token, ()):
+            if exercise not in seen:
+                seen.add(exercise)
+                candidates.append(exercise)
+    # processor=None: names are already lowercased/stripped, so skip
+    # rapidfuzz's default per-candidate preprocessing pass
+    result = process.extractOne(
+        name, candidates or _KNOWN_EXERCISES_TUPLE,
+        scorer=fuzz.ratio, processor=None, score_cutoff=80
+    )
+    return result[0] if result else name
+
+# Per-field presence checks, hoisted so validate_workout_data runs a
+# tight loop with no per-call allocation. Weight only checks for None
+# because 0 is a valid bodyweight entry.
+_FIELD_CHECKS = (
+    ('exercise', lambda v: bool(v)),
+    ('weight', lambda v: v is not None),
+    ('reps', lambda v: v is not None and v > 0),
+    ('sets', lambda v: v is not None and v > 0),
+)
 
 def validate_workout_data(workout_data):
     """
@@ -142,15 +416,9 @@ def validate_workout_data(workout_data):
     workout_data['exercise'] = map_exercise_name(exercise)
 
     # Check for missing required fields
-    missing_fields = []
-    if not workout_data.get('exercise'):
-        missing_fields.append('exercise')
-    if workout_data.get('weight') is None:  # Only check for None, not <= 0
-        missing_fields.append('weight')
-    if workout_data.get('reps') is None or workout_data['reps'] <= 0:
-        missing_fields.append('reps')
-    if workout_data.get('sets') is None or workout_data['sets'] <= 0:
-        missing_fields.append('sets')
+    missing_fields = [
+        field for field, ok in _FIELD_CHECKS if not ok(workout_data.get(field))
+    ]
 
     return len(missing_fields) == 0, missing_fields
 
@@ -165,126 +433,287 @@ def normalize_numeric_fields(workout_data):
             workout_data[field] = None
     return workout_data
 
+def looks_like_workout(message):
+    """
+    Cheap pre-filter for fresh conversations: a workout message mentions
+    a known exercise word or at least contains a number. Saves a full
+    model invocation on junk input like "hi" or "?".
+    """
+    if any(ch.isdigit() for ch in message):
+        return True
+    # Substring containment, not token equality: plurals ("pushups") and
+    # hyphenated forms ("push-ups") must still pass the pre-filter
+    lowered = message.lower()
+    return any(exercise in lowered for exercise in _KNOWN_SUBSTRINGS)
+
+def _invoke_streaming(request_body):
+    """
+    Call invoke_model_with_response_stream and assemble only the first
+    content block, closing the stream the moment it completes so trailing
+    events are never read off the wire.
+    Returns a response body shaped like the non-streaming API's.
+    """
+    response = bedrock.invoke_model_with_response_stream(
+        modelId=MODEL_ID,
+        body=orjson.dumps(request_body)
+    )
+    stream = response['body']
+    fragments = []
+    block_type = None
+    try:
+        for event in stream:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            payload = orjson.loads(chunk['bytes'])
+            event_type = payload.get('type')
+            if event_type == 'content_block_start':
+                block_type = payload.get('content_block', {}).get('type')
+            elif event_type == 'content_block_delta':
+                delta = payload.get('delta', {})
+                if delta.get('type') == 'input_json_delta':
+                    fragments.append(delta.get('partial_json', ''))
+                elif delta.get('type') == 'text_delta':
+                    fragments.append(delta.get('text', ''))
+            elif event_type == 'content_block_stop':
+                # First completed block carries the tool input; bail early
+                break
+    finally:
+        close = getattr(stream, 'close', None)
+        if close is not None:
+            close()
+
+    joined = ''.join(fragments)
+    if block_type == 'tool_use':
+        return {'content': [{
+            'type': 'tool_use',
+            'input': orjson.loads(joined) if joined else {}
+        }]}
+    return {'content': [{'type': 'text', 'text': joined}]}
+
 def extract_workout_data(message, chat_history):
     """
     Extract workout data from user message using Claude.
     Returns tuple of (workout_data, missing_fields).
     """
-    # Build context from chat history
-    context = "\n".join([
-        f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
-        for msg in chat_history[-5:]  # Last 5 turns for context
-    ]) if chat_history else ""
-
-    # Construct prompt for Claude
-    prompt = (
-        "Extract workout information from this text. Return ONLY a JSON object with these fields:\n"
-        "{\n"
-        "  \"exercise\": \"EXERCISE NAME IN UPPERCASE\",\n"
-        "  \"sets\": number or null,\n"
-        "  \"reps\": number or null,\n"
-        "  \"weight\": number in pounds or null\n"
-        "}\n"
-        "If a field is missing or unclear, use null.\n"
-        "IMPORTANT: The exercise name MUST be in UPPERCASE letters.\n"
-        "For bodyweight/calisthenics exercises, set weight to 0.\n"
-        "Unless otherwise specified, the format the user says their info is weight, reps, sets.\n"
-    )
-
-    if context:
-        prompt += f"\nPrevious context:\n{context}\n"
-    prompt += f"\nCurrent message: {message}"
+    # History rides as structured turns instead of being flattened into
+    # the prompt; the last history turn carries a cache breakpoint so
+    # everything up to it is billed at the cached rate on the next call
+    history = chat_history[-5:] if chat_history else []
+    # The Messages API rejects conversations that don't open with a user
+    # turn, and an odd-length tail of an alternating history starts with
+    # the assistant; drop leading non-user turns so the slice is valid
+    while history and history[0].get('role') != 'user':
+        history = history[1:]
+    messages = [
+        {'role': 'user' if msg.get('role') == 'user' else 'assistant',
+         'content': [{'type': 'text', 'text': msg.get('content', '')}]}
+        for msg in history
+    ]
+    if messages:
+        messages[-1]['content'][0]['cache_control'] = {'type': 'ephemeral'}
+    messages.append({'role': 'user', 'content': f"Current message: {message}"})
 
     # Call Claude
     try:
-        # Updated Bedrock request format
-        response = bedrock.invoke_model(
-            modelId='anthropic.claude-instant-v1',
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 512,
-                "temperature": 0,
-                "messages": [{
-                    "role": "user",
-                    "content": prompt
-                }]
-            })
-        )
-
-        # Extract JSON from response
-        response_body = json.loads(response['body'].read())
-        # Claude returns a list of content blocks, we want the first one
-        response_text = response_body.get('content', [{}])[0].get('text', '')
-
-        # Log the raw response for debugging
-        logger.info("Raw Claude response: %s", response_text)
-
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if not json_match:
-            logger.warning("No JSON found in response: %s", response_text)
+        # Forced tool use: Claude must answer through record_workout
+        request_body = dict(_BODY_TEMPLATE)
+        request_body['messages'] = messages
+        if BEDROCK_STREAMING:
+            response_body = _invoke_streaming(request_body)
+        else:
+            response = bedrock.invoke_model(
+                modelId=MODEL_ID,
+                body=orjson.dumps(request_body)
+            )
+            response_body = orjson.loads(response['body'].read())
+        content_blocks = response_body.get('content', [{}])
+
+        # Happy path: the tool_use block carries the parsed dict directly
+        parsed = None
+        for block in content_blocks:
+            if block.get('type') == 'tool_use':
+                tool_input = block.get('input') or {}
+                parsed = tool_input.get('workouts', [tool_input])
+                break
+
+        if parsed is None:
+            # Fallback: model answered with a text block; scan it for JSON.
+            # Raw model output is DEBUG only - it echoes user content.
+            response_text = content_blocks[0].get('text', '')
+            logger.debug("Raw Claude response: %s", response_text)
+
+            # The text is near-always bare JSON; try parsing it whole and
+            # only fall back to the bracket scan when prose surrounds it
+            try:
+                parsed = orjson.loads(response_text.strip())
+            except orjson.JSONDecodeError:
+                obj_start = response_text.find('{')
+                arr_start = response_text.find('[')
+                if arr_start != -1 and (obj_start == -1 or arr_start < obj_start):
+                    start, end = arr_start, response_text.rfind(']')
+                else:
+                    start, end = obj_start, response_text.rfind('}')
+                if start == -1 or end == -1 or end < start:
+                    logger.warning("No JSON found in response: %s", response_text)
+                    return None, ["exercise", "sets", "reps", "weight"]
+
+                try:
+                    parsed = orjson.loads(response_text[start:end + 1])
+                except orjson.JSONDecodeError as e:
+                    logger.error("Failed to parse JSON from Claude: %s", str(e))
+                    return None, ["exercise", "sets", "reps", "weight"]
+
+        workouts = parsed if isinstance(parsed, list) else [parsed]
+        workouts = [w for w in workouts if isinstance(w, dict)]
+        if not workouts:
             return None, ["exercise", "sets", "reps", "weight"]
 
-        try:
-            workout_data = json.loads(json_match.group(0))
+        missing_fields = []
+        for workout_data in workouts:
             # Force exercise name to uppercase
             if workout_data.get('exercise'):
                 workout_data['exercise'] = workout_data['exercise'].upper()
+            normalize_numeric_fields(workout_data)
+            _, missing = validate_workout_data(workout_data)
+            # First incomplete workout drives the follow-up question
+            if missing and not missing_fields:
+                missing_fields = missing
 
-            workout_data = normalize_numeric_fields(workout_data)
-            _, missing_fields = validate_workout_data(workout_data)  # Use _ to ignore is_valid
+        # Return the workout data even if it's incomplete
+        return workouts, missing_fields
 
-            # Return the workout data even if it's incomplete
-            return workout_data, missing_fields
-
-        except json.JSONDecodeError as e:
-            logger.error("Failed to parse JSON from Claude: %s", str(e))
-            return None, ["exercise", "sets", "reps", "weight"]
-
-    except (boto3.exceptions.Boto3Error, json.JSONDecodeError) as e:
+    except (boto3.exceptions.Boto3Error, orjson.JSONDecodeError) as e:
         logger.error("Error extracting workout data: %s", str(e))
         return None, ["exercise", "sets", "reps", "weight"]
 
-def save_workout(workout_data, user_id):
-    """Save workout data to DynamoDB."""
+def fetch_todays_workouts(user_id):
+    """Fetch the workouts a user has already saved today."""
     try:
-        timestamp = int(time.time())
-        date_string = datetime.now().strftime('%Y-%m-%d')
-        workout_id = f"DATE#{date_string}#TIME#{timestamp}"
-        item = {
-            'userId': user_id,
-            'workoutId': workout_id,
-            'userId_exercise': f"{user_id}#EXERCISE#{workout_data['exercise']}",
-            'date': date_string,
-            'timestamp': str(timestamp),  # Convert to string for GSI
-            'exercise': workout_data['exercise'],
-            'sets': int(workout_data['sets']),
-            'reps': int(workout_data['reps']),
-        }
+        response = ddb.query(
+            TableName=TABLE_NAME,
+            IndexName='DateIndex',
+            KeyConditionExpression='userId = :uid AND #d = :date',
+            ExpressionAttributeNames={'#d': 'date'},
+            ExpressionAttributeValues={
+                ':uid': {'S': user_id},
+                ':date': {'S': time.strftime('%Y-%m-%d', time.gmtime())}
+            }
+        )
+        deserialize = _DESERIALIZER.deserialize
+        return [{k: deserialize(v) for k, v in item.items()}
+                for item in response.get('Items', [])]
+    except boto3.exceptions.Boto3Error as e:
+        logger.warning("Prefetch of today's workouts failed: %s", str(e))
+        return []
+
+def find_duplicate_workout(workout_data, todays_items):
+    """Return an already-saved item matching this workout, if any."""
+    for item in todays_items:
+        if (item.get('exercise') == workout_data['exercise']
+                and float(item.get('weight') or 0) == float(workout_data['weight'] or 0)
+                and int(item.get('reps') or 0) == int(workout_data['reps'])
+                and int(item.get('sets') or 0) == int(workout_data['sets'])):
+            return item
+    return None
+
+def build_workout_item(workout_data, user_id, timestamp, date_string, sequence):
+    """Build a pre-marshalled DynamoDB item for one workout."""
+    # Handle weight field separately for clarity; quantize straight from
+    # the float so no intermediate string is built before marshalling
+    weight_value = workout_data['weight']
+    if weight_value is None:
+        weight_str = '0'
+    else:
+        weight_str = str(
+            Decimal(weight_value).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+        )
 
-        # Handle weight field separately for clarity
-        weight_value = workout_data['weight']
+    # Sequence suffix keeps ids unique when several workouts share a second
+    workout_id = f"DATE#{date_string}#TIME#{timestamp}"
+    if sequence:
+        workout_id = f"{workout_id}#{sequence}"
+
+    item = {
+        'userId': {'S': user_id},
+        'workoutId': {'S': workout_id},
+        'date': {'S': date_string},
+        'timestamp': {'S': str(timestamp)},  # String for GSI sort key
+        'exercise': {'S': workout_data['exercise']},
+        'sets': {'N': str(int(workout_data['sets']))},
+        'reps': {'N': str(int(workout_data['reps']))},
+        'weight': {'N': weight_str},
+    }
+    # DynamoDB keeps items without the indexed attribute out of the GSI,
+    # so skipping the fan-out key saves an index write per put
+    if not SPARSE_EXERCISE_INDEX:
+        item['userId_exercise'] = {'S': f"{user_id}#EXERCISE#{workout_data['exercise']}"}
+    return workout_id, item
 
-        # Convert weight to Decimal with proper handling for None values
-        if weight_value is None:
-            item['weight'] = Decimal('0')
+def save_workouts(workouts, user_id):
+    """
+    Save one or more workouts to DynamoDB.
+    Single workouts use PutItem; multi-workout messages are batched so the
+    whole message costs one round-trip per 25 items instead of one each.
+    Returns tuple of (success, workout_ids).
+    """
+    try:
+        # One clock read, formatted in UTC to skip the local tz lookup
+        timestamp = int(time.time())
+        date_string = time.strftime('%Y-%m-%d', time.gmtime(timestamp))
+
+        workout_ids = []
+        items = []
+        for i, workout_data in enumerate(workouts):
+            workout_id, item = build_workout_item(
+                workout_data, user_id, timestamp, date_string, i
+            )
+            workout_ids.append(workout_id)
+            items.append(item)
+
+        if len(items) == 1:
+            ddb.put_item(TableName=TABLE_NAME, Item=items[0])
         else:
-            # Round to 2 decimal places and convert to Decimal for DynamoDB
-            rounded_weight = round(weight_value, 2)
-            item['weight'] = Decimal(str(rounded_weight))
-
-        table.put_item(Item=item)
-        return True, workout_id
+            # BatchWriteItem accepts at most 25 items per request and
+            # returns throttled writes as UnprocessedItems instead of
+            # raising; resend those with backoff or the save silently
+            # drops workouts while reporting success
+            for chunk_start in range(0, len(items), 25):
+                chunk = items[chunk_start:chunk_start + 25]
+                request_items = {
+                    TABLE_NAME: [{'PutRequest': {'Item': item}} for item in chunk]
+                }
+                for attempt in range(MAX_BATCH_ATTEMPTS):
+                    response = ddb.batch_write_item(RequestItems=request_items)
+                    request_items = response.get('UnprocessedItems') or {}
+                    if not request_items:
+                        break
+                    time.sleep(min(2 ** attempt * 0.05, 2.0))
+                if request_items:
+                    logger.error(
+                        "BatchWriteItem left unprocessed items after %s attempts",
+                        MAX_BATCH_ATTEMPTS
+                    )
+                    return False, []
+
+        for workout_data in workouts:
+            invalidate_workout_cache(user_id, workout_data['exercise'])
+        return True, workout_ids
     except (boto3.exceptions.Boto3Error, ValueError) as e:
-        logger.error("Error saving workout: %s", str(e))
-        return False, None
+        logger.error("Error saving workouts: %s", str(e))
+        return False, []
 
 def lambda_handler(event, _):
     """Main Lambda handler."""
     try:
+        # Prime AWS clients on the first invocation of a fresh container
+        if not _WARM and 'AWS_LAMBDA_FUNCTION_NAME' in os.environ:
+            _warm()
+
         # Parse request
         body = event.get('body', {})
         if isinstance(body, str):
-            body = json.loads(body)
+            body = orjson.loads(body)
 
         message = body.get('message', '')
         chat_history = body.get('chat_history', [])
@@ -293,49 +722,113 @@ def lambda_handler(event, _):
         if not message:
             return {
                 'statusCode': 400,
-                'body': json.dumps({'error': 'Message is required'})
+                'body': _ERR_MESSAGE_REQUIRED
             }
 
-        # Extract workout data
-        workout_data, missing_fields = extract_workout_data(message, chat_history)
+        # Obvious non-workout chatter short-circuits before Bedrock.
+        # Follow-ups (with history) skip the check - they may be bare
+        # answers like "3 sets".
+        if not chat_history and not looks_like_workout(message):
+            return {
+                'statusCode': 200,
+                'body': _ERR_NOT_A_WORKOUT
+            }
+
+        # Speculatively fetch today's workouts while Claude is generating;
+        # the DynamoDB round-trip hides entirely behind the Bedrock latency
+        recent_future = None
+        if PREFETCH_RECENT and chat_history:
+            recent_future = _EXECUTOR.submit(fetch_todays_workouts, user_id)
+
+        # Serve repeat messages from the response cache before paying for
+        # a Bedrock round-trip; only complete parses are ever cached
+        cache_key = None
+        workouts = None
+        missing_fields = []
+        if PARSE_CACHE_TABLE:
+            cache_key = parse_cache_key(user_id, message, chat_history)
+            workouts = get_cached_parse(cache_key)
+
+        if workouts is None:
+            # Extract workout data
+            workouts, missing_fields = extract_workout_data(message, chat_history)
+            if cache_key and workouts is not None and not missing_fields:
+                put_cached_parse(cache_key, workouts)
 
         # If we have no workout data at all
-        if workout_data is None:
+        if workouts is None:
             return {
                 'statusCode': 200,
-                'body': json.dumps({
-                    'error': 'Could not extract workout data',
-                    'missing_fields': ["exercise", "sets", "reps", "weight"]
-                })
+                'body': _ERR_NO_WORKOUT
             }
 
+        # First workout keeps the single-workout response shape stable
+        workout_data = workouts[0]
+
         # If we have missing fields, return partial data for follow-up
         if missing_fields:
             return {
                 'statusCode': 200,
-                'body': json.dumps({
+                'body': orjson.dumps({
                     'workout': workout_data,  # Include the partial workout data
                     'missing_fields': missing_fields,
                     'message': f"Please provide: {', '.join(missing_fields)}"
-                })
+                }).decode()
             }
 
-        # Save complete workout
-        success, workout_id = save_workout(workout_data, user_id)
+        # Skip the write if this exact workout was already saved today
+        if recent_future is not None and len(workouts) == 1:
+            try:
+                todays_items = recent_future.result(timeout=2)
+            except FuturesTimeoutError:
+                # A slow prefetch must not take down the save path; skip
+                # the duplicate check and fall through to the write
+                logger.warning("Prefetch of today's workouts timed out")
+                todays_items = []
+            duplicate = find_duplicate_workout(workout_data, todays_items)
+            if duplicate:
+                return {
+                    'statusCode': 200,
+                    'body': orjson.dumps({
+                        'workout': workout_data,
+                        'saved': True,
+                        'workout_id': duplicate.get('workoutId'),
+                        'message': 'Workout already recorded today'
+                    }).decode()
+                }
+
+        # Save complete workouts (batched when the message had several).
+        # The write runs on the pool so response assembly overlaps the
+        # DynamoDB round-trip; join right before serializing.
+        save_future = _EXECUTOR.submit(save_workouts, workouts, user_id)
+
+        response_body = {'workout': workout_data}
+        if len(workouts) > 1:
+            response_body['workouts'] = workouts
+
+        try:
+            success, workout_ids = save_future.result(timeout=5)
+        except FuturesTimeoutError:
+            # Degrade the same way a failed synchronous save did instead
+            # of letting the timeout escape the handler
+            logger.error("Timed out waiting for the workout save")
+            success, workout_ids = False, []
+        response_body['saved'] = success
+        response_body['workout_id'] = workout_ids[0] if success else None
+        response_body['message'] = (
+            'Workout saved successfully' if success else 'Failed to save workout'
+        )
+        if len(workouts) > 1:
+            response_body['workout_ids'] = workout_ids if success else None
 
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'workout': workout_data,
-                'saved': success,
-                'workout_id': workout_id if success else None,
-                'message': 'Workout saved successfully' if success else 'Failed to save workout'
-            })
+            'body': orjson.dumps(response_body).decode()
         }
 
-    except (json.JSONDecodeError, boto3.exceptions.Boto3Error) as e:
+    except (orjson.JSONDecodeError, boto3.exceptions.Boto3Error) as e:
         logger.error("Error in lambda_handler: %s", str(e))
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': 'Internal server error'})
+            'body': _ERR_INTERNAL
         }
@@ -82,13 +82,24 @@ Analytics:
 """
 
 import json
+import os
 import time
 import logging
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime
-from typing import Dict, Any, Tuple
+from typing import Callable, Dict, Any, List, Tuple
 import boto3
 
+# orjson parses request bodies 2-3x faster than stdlib json and accepts
+# both str and bytes; its JSONDecodeError subclasses json.JSONDecodeError
+# so the invalid-JSON handler below needs no change. Fall back so the
+# function still runs without the extra deployment dependency.
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -96,6 +107,119 @@ logger.setLevel(logging.INFO)
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table('UserWorkouts')
 
+# Retry schedule for BatchWriteItem leftovers
+MAX_BATCH_ATTEMPTS = 5
+
+_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+# Fixed error messages serialized once at import; errors that embed
+# per-request detail (bad exercise index, internal errors) still
+# serialize per call.
+_ERROR_RESPONSES = {
+    'NO_USER': (400, json.dumps({'error': 'userId is required'})),
+    'EMPTY_EXERCISES': (400, json.dumps({'error': 'exercises must be a non-empty array'})),
+    'BAD_JSON': (400, json.dumps({'error': 'Invalid JSON format in request body'})),
+}
+
+def _error_response(code: str) -> Dict[str, Any]:
+    """Build an error response from the precomputed table."""
+    status, body = _ERROR_RESPONSES[code]
+    return {'statusCode': status, 'headers': _HEADERS, 'body': body}
+
+# Weight quantum; quantize replaces the float->round->str->Decimal chain
+_Q2 = Decimal('0.01')
+
+# Feature flag: omit userId_exercise so items stay out of the exercise
+# GSIs (sparse index), saving one index write per put. Only safe for
+# deployments that don't serve exercise/progress queries.
+SPARSE_EXERCISE_INDEX = os.environ.get('SPARSE_EXERCISE_INDEX', '').lower() in ('1', 'true')
+
+def batch_write_with_retry(items: List[Dict[str, Any]]) -> None:
+    """
+    Write items in chunks of 25 with BatchWriteItem, retrying
+    UnprocessedItems with exponential backoff.
+
+    table.batch_writer() chunks but does not back off on throttled
+    leftovers, which drops writes under sustained load.
+    """
+    # The resource-layer client marshalls plain Python values itself, so
+    # items go in unserialized
+    client = table.meta.client
+    for chunk_start in range(0, len(items), 25):
+        chunk = items[chunk_start:chunk_start + 25]
+        request_items = {
+            table.name: [{'PutRequest': {'Item': item}} for item in chunk]
+        }
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            response = client.batch_write_item(RequestItems=request_items)
+            request_items = response.get('UnprocessedItems') or {}
+            if not request_items:
+                break
+            time.sleep(min(2 ** attempt * 0.05, 2.0))
+        if request_items:
+            raise RuntimeError(
+                f"BatchWriteItem left unprocessed items after {MAX_BATCH_ATTEMPTS} attempts"
+            )
+
+def _uuid7(ns: Callable[[], int] = time.time_ns,
+           rand: Callable[[int], bytes] = os.urandom) -> str:
+    """Build a UUIDv7-format string: 48-bit ms timestamp, then randomness.
+
+    Time-ordered, so items stay chronologically sorted under the range
+    key, and collision-free across concurrent submissions — unlike the
+    old second-resolution timestamp + index suffix, which collided when
+    two requests landed in the same second.
+    """
+    t = (ns() // 1_000_000) & 0xFFFFFFFFFFFF
+    r = rand(10)
+    return (
+        f"{t >> 16:08x}-{t & 0xFFFF:04x}"
+        f"-7{r[0] & 0x0F:x}{r[1]:02x}"
+        f"-{(r[2] & 0x3F) | 0x80:02x}{r[3]:02x}"
+        f"-{r[4:].hex()}"
+    )
+
+def _validate_numeric_py(weight: float, reps: int, sets: int) -> int:
+    """Range-check the numeric exercise fields.
+
+    Returns 0 when valid, else a code indexing _NUMERIC_ERRORS. Kept as
+    a scalar-only function so numba can compile it when available.
+    """
+    if weight < 0:
+        return 1
+    if reps <= 0:
+        return 2
+    if sets <= 0:
+        return 3
+    return 0
+
+# Bulk imports validate thousands of exercises per request; numba jits
+# the scalar range checks to machine code when installed. cache=True
+# persists the compiled artifact so compilation is paid once at
+# container-build time (see warmup), not on the first request.
+try:
+    from numba import njit
+    _validate_numeric = njit(cache=True)(_validate_numeric_py)
+except ImportError:
+    _validate_numeric = _validate_numeric_py
+
+_NUMERIC_ERRORS = {
+    1: "Weight cannot be negative",
+    2: "Reps must be positive",
+    3: "Sets must be positive",
+}
+
+def warmup() -> None:
+    """Force numba compilation (a no-op call without numba).
+
+    Invoke at container-build or init time so the on-disk jit cache is
+    populated before the first real request.
+    """
+    _validate_numeric(0.0, 1, 1)
+
 def validate_exercise(exercise: Dict[str, Any]) -> Tuple[bool, str]:
     """
     Validate a single exercise object.
@@ -112,36 +236,34 @@ def validate_exercise(exercise: Dict[str, Any]) -> Tuple[bool, str]:
     if missing := required_fields - exercise.keys():
         return False, f"Missing required fields: {missing}"
 
-    # Define validation rules as (condition, error_message) pairs
-    validation_rules = [
-        (lambda: not isinstance(exercise['name'], str),
-         "Exercise name must be a string"),
-        (lambda: not isinstance(exercise['weight'], (int, float)),
-         "Weight must be a number"),
-        (lambda: not isinstance(exercise['reps'], int),
-         "Reps must be an integer"),
-        (lambda: not isinstance(exercise['sets'], int),
-         "Sets must be an integer"),
-        (lambda: exercise['weight'] < 0,
-         "Weight cannot be negative"),
-        (lambda: exercise['reps'] <= 0,
-         "Reps must be positive"),
-        (lambda: exercise['sets'] <= 0,
-         "Sets must be positive"),
-    ]
-
-    # Check each validation rule
-    for check_condition, error_message in validation_rules:
-        if check_condition():
-            return False, error_message
+    # Straight conditionals: no per-call lambda construction or dispatch,
+    # which matters when bulk imports validate every exercise in a batch
+    if not isinstance(exercise['name'], str):
+        return False, "Exercise name must be a string"
+    weight = exercise['weight']
+    if not isinstance(weight, (int, float)):
+        return False, "Weight must be a number"
+    reps = exercise['reps']
+    if not isinstance(reps, int):
+        return False, "Reps must be an integer"
+    sets = exercise['sets']
+    if not isinstance(sets, int):
+        return False, "Sets must be an integer"
+    if code := _validate_numeric(weight, reps, sets):
+        return False, _NUMERIC_ERRORS[code]
 
     return True, None
 
-def lambda_handler(event: Dict[str, Any], _: Any) -> Dict[str, Any]:
-    """Handle incoming workout data, validate it, and store in DynamoDB."""
+def lambda_handler(event: Dict[str, Any], _: Any,
+                   _clock: Callable[[], float] = time.time) -> Dict[str, Any]:
+    """Handle incoming workout data, validate it, and store in DynamoDB.
+
+    _clock exists for tests to inject a fixed timestamp source without
+    patching time.time globally.
+    """
     try:
         if isinstance(event.get('body'), str):
-            body = json.loads(event['body'])
+            body = _loads(event['body'])
         else:
             body = event.get('body', {})
 
@@ -149,16 +271,10 @@ def lambda_handler(event: Dict[str, Any], _: Any) -> Dict[str, Any]:
         exercises = body.get('exercises', [])
 
         if not user_id:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'userId is required'})
-            }
+            return _error_response('NO_USER')
 
         if not isinstance(exercises, list) or not exercises:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'error': 'exercises must be a non-empty array'})
-            }
+            return _error_response('EMPTY_EXERCISES')
 
         # Validate all exercises
         for i, exercise in enumerate(exercises):
@@ -166,47 +282,48 @@ def lambda_handler(event: Dict[str, Any], _: Any) -> Dict[str, Any]:
             if not is_valid:
                 return {
                     'statusCode': 400,
+                    'headers': _HEADERS,
                     'body': json.dumps({
                         'error': f'Invalid exercise at index {i}: {error_message}'
                     })
                 }
 
         # Create items for DynamoDB with new key structure
-        timestamp = int(time.time())
+        timestamp = int(_clock())
         date_string = datetime.now().strftime('%Y-%m-%d')
         saved_workout_ids = []
 
-        # Use batch writer for efficiency with multiple items
-        with table.batch_writer() as batch:
-            for i, exercise in enumerate(exercises):
-                # Create a workoutId that includes date, timestamp, and index for uniqueness
-                workout_id = f"DATE#{date_string}#TIME#{timestamp}#{i}"
-
-                # Create a userId_exercise composite key for exercise-based queries
-                user_id_exercise = f"{user_id}#EXERCISE#{exercise['name']}"
-
-                # Create the item with the new structure
-                item = {
-                    'userId': user_id,                  # Primary partition key
-                    'workoutId': workout_id,            # Primary sort key
-                    'userId_exercise': user_id_exercise, # GSI2 partition key
-                    'date': date_string,                # GSI1 sort key
-                    'timestamp': str(timestamp),        # GSI2 sort key - CHANGED TO STRING
-                    'exercise': exercise['name'],
-                    'sets': int(exercise['sets']),
-                    'reps': int(exercise['reps']),
-                    'weight': Decimal(str(round(float(exercise['weight']), 2))),
-                }
-                batch.put_item(Item=item)
-                saved_workout_ids.append(workout_id)
+        # Build all items up front, then batch them with explicit retries
+        items = []
+        for exercise in exercises:
+            # Keep the DATE#...#TIME# key shape; the UUIDv7 suffix is
+            # time-ordered like the old timestamp but collision-free
+            workout_id = f"DATE#{date_string}#TIME#{_uuid7()}"
+
+            # Create the item with the new structure
+            item = {
+                'userId': user_id,                  # Primary partition key
+                'workoutId': workout_id,            # Primary sort key
+                'date': date_string,                # GSI1 sort key
+                'timestamp': str(timestamp),        # GSI2 sort key - CHANGED TO STRING
+                'exercise': exercise['name'],
+                'sets': int(exercise['sets']),
+                'reps': int(exercise['reps']),
+                'weight': Decimal(exercise['weight']).quantize(_Q2, rounding=ROUND_HALF_UP),
+            }
+            # Composite key for exercise-based queries; omitted under the
+            # sparse-index flag so the item skips the GSI write entirely
+            if not SPARSE_EXERCISE_INDEX:
+                item['userId_exercise'] = f"{user_id}#EXERCISE#{exercise['name']}"
+            items.append(item)
+            saved_workout_ids.append(workout_id)
+
+        batch_write_with_retry(items)
 
         logger.info("Saved %s exercises for user %s", len(saved_workout_ids), user_id)
         return {
             'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': _HEADERS,
             'body': json.dumps({
                 'message': 'Workout saved successfully',
                 'workoutIds': saved_workout_ids,
@@ -217,22 +334,12 @@ def lambda_handler(event: Dict[str, Any], _: Any) -> Dict[str, Any]:
 
     except json.JSONDecodeError:
         logger.error("Invalid JSON format in request body")
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({'error': 'Invalid JSON format in request body'})
-        }
+        return _error_response('BAD_JSON')
     except Exception as e:  # pylint: disable=broad-exception-caught
         logger.error("Error in lambda_handler: %s", str(e), exc_info=True)
         return {
             'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
+            'headers': _HEADERS,
             'body': json.dumps({'error': f'Internal server error: {str(e)}'})
         }
 
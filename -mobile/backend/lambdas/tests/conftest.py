@@ -10,31 +10,75 @@ import pytest
 from unittest.mock import MagicMock, patch
 import boto3
 from moto import mock_dynamodb, mock_lambda
+from datetime import datetime
 from decimal import Decimal
+from types import MappingProxyType
+
+def pytest_collection_modifyitems(items):
+    """Pin moto-backed tests to a single xdist worker.
+
+    Tests whose fixture closure reaches the session-scoped moto backend
+    (_moto_ctx) share one in-memory mock AWS server and must not be
+    split across worker processes. Everything else — in-memory fakes and
+    pure unit tests — can run on any worker under --dist loadgroup.
+    """
+    for item in items:
+        if "_moto_ctx" in item.fixturenames:
+            item.add_marker(pytest.mark.xdist_group(name="moto_dynamodb"))
 
 # Helper to import modules from specific Lambda directories
 def import_lambda_module(lambda_dir, module_name="lambda_function"):
-    """Import a module from a specific Lambda directory."""
+    """Import a module from a specific Lambda directory.
+
+    Imports are memoized through sys.modules: executing a lambda module
+    re-runs its top-level boto3 client construction, so repeat requests
+    return the already-loaded module instead.
+    """
+    qualified_name = f"{lambda_dir}.{module_name}"
+    if qualified_name in sys.modules:
+        return sys.modules[qualified_name]
+
     lambda_path = os.path.join(os.path.dirname(__file__), f"../{lambda_dir}")
     module_path = os.path.join(lambda_path, f"{module_name}.py")
-    
+
     if not os.path.exists(module_path):
         return None
-    
-    spec = importlib.util.spec_from_file_location(f"{lambda_dir}.{module_name}", module_path)
+
+    spec = importlib.util.spec_from_file_location(qualified_name, module_path)
     module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    sys.modules[qualified_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[qualified_name]
+        raise
     return module
 
-@pytest.fixture
-def parse_workout_module():
-    """Import the parse-workout Lambda module."""
+@pytest.fixture(scope="session")
+def boto3_client_stub():
+    """The stub client captured by parse-workout's module-level clients.
+
+    Session-scoped so it is created before parse_workout_module runs the
+    import; tests reset it between runs rather than rebuilding it.
+    """
+    return MagicMock()
+
+@pytest.fixture(scope="session")
+def parse_workout_module(aws_credentials, boto3_client_stub):
+    """Import the parse-workout Lambda module.
+
+    boto3.client is patched for the duration of the import so the
+    module's top-level bedrock/ddb clients resolve to boto3_client_stub
+    instead of real clients; the patch is lifted immediately after so
+    moto-backed fixtures elsewhere in the session are unaffected.
+    """
     # Add the parse-workout directory to sys.path temporarily
     parse_workout_path = os.path.join(os.path.dirname(__file__), "../parse-workout")
     sys.path.insert(0, parse_workout_path)
-    
+
     try:
-        module = import_lambda_module("parse-workout")
+        with patch("boto3.client", MagicMock(return_value=boto3_client_stub)):
+            module = import_lambda_module("parse-workout")
         return module
     finally:
         # Clean up sys.path after the test
@@ -42,7 +86,7 @@ def parse_workout_module():
             sys.path.remove(parse_workout_path)
 
 @pytest.fixture
-def submit_workout_module():
+def submit_workout_module(aws_credentials):
     """Import the submit-workout Lambda module."""
     # Add the submit-workout directory to sys.path temporarily
     submit_workout_path = os.path.join(os.path.dirname(__file__), "../submit-workout")
@@ -56,8 +100,8 @@ def submit_workout_module():
         if submit_workout_path in sys.path:
             sys.path.remove(submit_workout_path)
 
-@pytest.fixture
-def get_workouts_module():
+@pytest.fixture(scope="session")
+def get_workouts_module(aws_credentials):
     """Import the get-workouts Lambda module."""
     # Add the get-workouts directory to sys.path temporarily
     get_workouts_path = os.path.join(os.path.dirname(__file__), "../get-workouts")
@@ -72,7 +116,7 @@ def get_workouts_module():
             sys.path.remove(get_workouts_path)
 
 # DynamoDB fixtures
-@pytest.fixture
+@pytest.fixture(scope="session")
 def aws_credentials():
     """Mocked AWS Credentials for boto3."""
     os.environ["AWS_ACCESS_KEY_ID"] = "testing"
@@ -81,56 +125,137 @@ def aws_credentials():
     os.environ["AWS_SESSION_TOKEN"] = "testing"
     os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
 
-@pytest.fixture
-def dynamodb_table(aws_credentials):
-    """Create a mock DynamoDB table for testing."""
+@pytest.fixture(scope="session")
+def _boto_session(aws_credentials):
+    """One boto3 Session shared by every client and resource fixture.
+
+    Clients built from a shared Session reuse its botocore loader, so
+    the service-model JSON for each AWS service is parsed once per run
+    instead of once per default-session client construction.
+    """
+    return boto3.Session()
+
+@pytest.fixture(scope="session")
+def _moto_ctx(aws_credentials):
+    """Keep one moto DynamoDB backend alive for the whole pytest run.
+
+    Each mock_dynamodb() start/stop cycle re-patches botocore and resets
+    moto's in-memory state. Tests must not apply @mock_dynamodb
+    themselves: nesting contexts would reset the shared backend
+    mid-session.
+    """
     with mock_dynamodb():
-        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
-        
-        # Create workout table with required indexes
-        table = dynamodb.create_table(
-            TableName="UserWorkouts",
-            KeySchema=[
-                {"AttributeName": "userId", "KeyType": "HASH"},
-                {"AttributeName": "workoutId", "KeyType": "RANGE"}
-            ],
-            AttributeDefinitions=[
-                {"AttributeName": "userId", "AttributeType": "S"},
-                {"AttributeName": "workoutId", "AttributeType": "S"},
-                {"AttributeName": "date", "AttributeType": "S"},
-                {"AttributeName": "userId_exercise", "AttributeType": "S"}
-            ],
-            GlobalSecondaryIndexes=[
-                {
-                    "IndexName": "DateIndex",
-                    "KeySchema": [
-                        {"AttributeName": "userId", "KeyType": "HASH"},
-                        {"AttributeName": "date", "KeyType": "RANGE"}
-                    ],
-                    "Projection": {"ProjectionType": "ALL"},
-                    "ProvisionedThroughput": {
-                        "ReadCapacityUnits": 5,
-                        "WriteCapacityUnits": 5
-                    }
+        yield
+
+@pytest.fixture(scope="session")
+def dynamodb_resource(_moto_ctx, _boto_session):
+    """One boto3 DynamoDB resource for the whole session.
+
+    Constructing a resource makes botocore parse the service model JSON
+    from disk; caching it means that happens once instead of per test.
+    """
+    return _boto_session.resource("dynamodb", region_name="us-east-1")
+
+# Session-scoped: creating the table (three GSIs) through moto is the
+# most expensive fixture in the suite, and tests only ever read back
+# keys they wrote themselves, so sharing one table is safe.
+@pytest.fixture(scope="session")
+def dynamodb_table(dynamodb_resource):
+    """Create a mock DynamoDB table for testing."""
+    dynamodb = dynamodb_resource
+
+    # Create workout table with required indexes
+    table = dynamodb.create_table(
+        TableName="UserWorkouts",
+        KeySchema=[
+            {"AttributeName": "userId", "KeyType": "HASH"},
+            {"AttributeName": "workoutId", "KeyType": "RANGE"}
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "userId", "AttributeType": "S"},
+            {"AttributeName": "workoutId", "AttributeType": "S"},
+            {"AttributeName": "date", "AttributeType": "S"},
+            {"AttributeName": "userId_exercise", "AttributeType": "S"},
+            {"AttributeName": "weight", "AttributeType": "N"}
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "DateIndex",
+                "KeySchema": [
+                    {"AttributeName": "userId", "KeyType": "HASH"},
+                    {"AttributeName": "date", "KeyType": "RANGE"}
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+                "ProvisionedThroughput": {
+                    "ReadCapacityUnits": 5,
+                    "WriteCapacityUnits": 5
+                }
+            },
+            {
+                "IndexName": "ExerciseIndex",
+                "KeySchema": [
+                    {"AttributeName": "userId_exercise", "KeyType": "HASH"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+                "ProvisionedThroughput": {
+                    "ReadCapacityUnits": 5,
+                    "WriteCapacityUnits": 5
+                }
+            },
+            {
+                "IndexName": "MaxWeightIndex",
+                "KeySchema": [
+                    {"AttributeName": "userId_exercise", "KeyType": "HASH"},
+                    {"AttributeName": "weight", "KeyType": "RANGE"}
+                ],
+                "Projection": {
+                    "ProjectionType": "INCLUDE",
+                    "NonKeyAttributes": ["date"]
                 },
-                {
-                    "IndexName": "ExerciseIndex",
-                    "KeySchema": [
-                        {"AttributeName": "userId_exercise", "KeyType": "HASH"},
-                    ],
-                    "Projection": {"ProjectionType": "ALL"},
-                    "ProvisionedThroughput": {
-                        "ReadCapacityUnits": 5,
-                        "WriteCapacityUnits": 5
-                    }
+                "ProvisionedThroughput": {
+                    "ReadCapacityUnits": 5,
+                    "WriteCapacityUnits": 5
                 }
-            ],
-            ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
-        )
-        
-        yield table
+            }
+        ],
+        ProvisionedThroughput={"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
+    )
+    
+    yield table
 
-@pytest.fixture
+# orjson parses response bodies 2-3x faster than stdlib json; fall back
+# so the suite still runs without it installed
+try:
+    import orjson
+    loads_body = orjson.loads
+except ImportError:
+    loads_body = json.loads
+
+@pytest.fixture(scope="session")
+def load_body():
+    """Return the fastest available JSON loader for response bodies."""
+    return loads_body
+
+@pytest.fixture(scope="session")
+def valid_workout_dict():
+    """Canonical complete workout payload.
+
+    Read-only so shared state can't be corrupted across tests; wrap in
+    dict() before passing anywhere that mutates.
+    """
+    return MappingProxyType({
+        "exercise": "bench press",
+        "weight": 135,
+        "reps": 8,
+        "sets": 3
+    })
+
+@pytest.fixture(scope="session")
+def today_str():
+    """Today's date, computed once so tests can't straddle midnight."""
+    return datetime.now().strftime('%Y-%m-%d')
+
+@pytest.fixture(scope="session")
 def sample_workout_data():
     """Sample workout data for testing."""
     return {
@@ -151,12 +276,11 @@ def sample_workout_data():
         ]
     }
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def populate_dynamodb(dynamodb_table, sample_workout_data):
     """Populate the DynamoDB table with sample workout data."""
-    from datetime import datetime
     import time
-    
+
     user_id = sample_workout_data["userId"]
     timestamp = int(time.time())
     date_string = datetime.now().strftime('%Y-%m-%d')
@@ -206,10 +330,10 @@ def populate_dynamodb(dynamodb_table, sample_workout_data):
 
 # Lambda fixtures
 @pytest.fixture
-def mock_lambda_client():
+def mock_lambda_client(_boto_session):
     """Mock Lambda client for testing."""
     with mock_lambda():
-        client = boto3.client('lambda', region_name='us-east-1')
+        client = _boto_session.client('lambda', region_name='us-east-1')
         
         # Create mock submit-workout Lambda function
         client.create_function(
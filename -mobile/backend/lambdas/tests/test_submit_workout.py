@@ -2,92 +2,166 @@
 Tests for the submit-workout Lambda function.
 """
 
+# boto3 is deliberately not imported here: collection would pay botocore's
+# service-model load for a module that only talks to the in-memory fake
 import json
-import time
-from decimal import Decimal
-from unittest.mock import patch
+import random
+import re
+from types import MappingProxyType, SimpleNamespace
 
-import boto3
 import pytest
 
+# orjson serializes/parses the JSON bodies these tests shuttle around
+# 2-3x faster than stdlib json; fall back so the suite runs without it
+try:
+    import orjson
+    _dumps = lambda o: orjson.dumps(o).decode()
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
+class FakeTable:
+    """Dict-backed stand-in for the boto3 DynamoDB Table resource.
+
+    Implements only the surface the handler and these tests touch:
+    put_item, get_item, and the meta.client batch_write_item that
+    batch_write_with_retry uses. Skips botocore service-model loading,
+    request marshalling, and moto's mock HTTP layer entirely, so each
+    handler call costs microseconds instead of tens of milliseconds.
+    """
+
+    name = "UserWorkouts"
+
+    def __init__(self):
+        self._items = {}
+        self.batch_calls = []
+        self.meta = SimpleNamespace(
+            client=SimpleNamespace(batch_write_item=self._batch_write_item)
+        )
+
+    def put_item(self, Item):
+        self._items[(Item["userId"], Item["workoutId"])] = Item
+
+    def get_item(self, Key):
+        item = self._items.get((Key["userId"], Key["workoutId"]))
+        return {"Item": item} if item is not None else {}
+
+    def _batch_write_item(self, RequestItems):
+        self.batch_calls.append(RequestItems)
+        for requests in RequestItems.values():
+            for request in requests:
+                self.put_item(request["PutRequest"]["Item"])
+        return {"UnprocessedItems": {}}
+
+@pytest.fixture
+def dynamodb_table(monkeypatch, submit_workout_module):
+    """In-memory fake table patched into the submit-workout module.
+
+    Overrides conftest's moto-backed session fixture for this module:
+    these are pure unit tests of the handler, so they don't need a real
+    boto3 round-trip. The moto fixtures stay in conftest for the suites
+    that exercise query/index behavior.
+    """
+    fake = FakeTable()
+    monkeypatch.setattr(submit_workout_module, "table", fake)
+    return fake
+
+# Canonical valid exercise shared by the event fixture and test copies
+_BASE_EXERCISE = MappingProxyType({
+    "name": "bench press",
+    "weight": 135.5,
+    "reps": 8,
+    "sets": 3
+})
+
+def _assert_error(response, status, err_substr):
+    """Assert an error response carrying the expected status and message."""
+    assert response["statusCode"] == status
+    body = _loads(response["body"])
+    assert err_substr in body["error"], body
+
+def _assert_ok(response):
+    """Assert a successful save response and return its parsed body."""
+    assert response["statusCode"] == 200
+    body = _loads(response["body"])
+    assert body["message"] == "Workout saved successfully"
+    return body
+
+# Pre-encoded at import so the string-body test measures only the handler
+_VALID_BODY_JSON = _dumps({
+    "userId": "test-user-123",
+    "exercises": [dict(_BASE_EXERCISE)]
+})
+
+@pytest.fixture(scope="class")
+def base_event():
+    """Canonical valid single-exercise event, built once per class.
+
+    Read-only so shared state can't leak between tests; the handler
+    type-checks for real dict/list, so tests materialize the body with
+    dict()/list copies of just the fields they touch.
+    """
+    return MappingProxyType({
+        "body": MappingProxyType({
+            "userId": "test-user-123",
+            "exercises": (_BASE_EXERCISE,)
+        })
+    })
+
 # Tests for the submit-workout Lambda function
 class TestSubmitWorkout:
     """Test cases for the submit-workout Lambda function."""
 
-    def test_validate_exercise_valid(self, submit_workout_module):
-        """Test exercise validation with valid exercise data."""
-        exercise = {
-            "name": "bench press",
-            "weight": 135.5,
-            "reps": 8,
-            "sets": 3
-        }
+    @pytest.mark.parametrize("exercise,expected_valid,err_substr", [
+        # valid exercise
+        (dict(_BASE_EXERCISE), True, None),
+        # missing reps field
+        ({k: v for k, v in _BASE_EXERCISE.items() if k != "reps"},
+         False, "Missing required fields"),
+        # string weight instead of number
+        ({**_BASE_EXERCISE, "weight": "135.5"}, False, "Weight must be a number"),
+        # negative reps
+        ({**_BASE_EXERCISE, "reps": -8}, False, "Reps must be positive"),
+    ])
+    def test_validate_exercise(self, submit_workout_module, exercise, expected_valid, err_substr):
+        """Test exercise validation across valid, missing-field, bad-type, and negative inputs."""
         is_valid, error = submit_workout_module.validate_exercise(exercise)
-        assert is_valid is True
-        assert error is None
-
-    def test_validate_exercise_missing_field(self, submit_workout_module):
-        """Test exercise validation with missing field."""
-        exercise = {
-            "name": "bench press",
-            "weight": 135.5,
-            "sets": 3
-            # Missing reps field
-        }
-        is_valid, error = submit_workout_module.validate_exercise(exercise)
-        assert is_valid is False
-        assert "Missing required fields" in error
-
-    def test_validate_exercise_invalid_types(self, submit_workout_module):
-        """Test exercise validation with invalid types."""
-        exercise = {
-            "name": "bench press",
-            "weight": "135.5",  # String instead of number
-            "reps": 8,
-            "sets": 3
-        }
-        is_valid, error = submit_workout_module.validate_exercise(exercise)
-        assert is_valid is False
-        assert "Weight must be a number" in error
-
-    def test_validate_exercise_negative_values(self, submit_workout_module):
-        """Test exercise validation with negative values."""
-        exercise = {
-            "name": "bench press",
-            "weight": 135.5,
-            "reps": -8,  # Negative reps
-            "sets": 3
-        }
-        is_valid, error = submit_workout_module.validate_exercise(exercise)
-        assert is_valid is False
-        assert "Reps must be positive" in error
-
-    def test_lambda_handler_success(self, dynamodb_table, submit_workout_module):
+        assert is_valid is expected_valid
+        if err_substr is None:
+            assert error is None
+        else:
+            assert err_substr in error
+
+    @pytest.mark.numba
+    def test_validate_numeric_parity(self, submit_workout_module):
+        """Test the numba-compiled numeric validator against the Python reference."""
+        pytest.importorskip("numba")
+        rng = random.Random(1234)
+        for _ in range(10_000):
+            weight = rng.uniform(-50.0, 500.0)
+            reps = rng.randint(-5, 30)
+            sets = rng.randint(-5, 10)
+            assert (submit_workout_module._validate_numeric(weight, reps, sets)
+                    == submit_workout_module._validate_numeric_py(weight, reps, sets))
+
+    def test_lambda_handler_success(self, dynamodb_table, submit_workout_module, base_event):
         """Test successful workout submission."""
         # Prepare test event
-        event = {
-            "body": {
-                "userId": "test-user-123",
-                "exercises": [
-                    {
-                        "name": "bench press",
-                        "weight": 135.5,
-                        "reps": 8,
-                        "sets": 3
-                    }
-                ]
-            }
-        }
+        event = {"body": {**base_event["body"], "exercises": [dict(_BASE_EXERCISE)]}}
 
-        # Call the handler
-        with patch('time.time', return_value=1234567890):
-            response = submit_workout_module.lambda_handler(event, None)
+        # Call the handler with an injected fixed clock; no mock.patch needed
+        response = submit_workout_module.lambda_handler(
+            event, None, _clock=lambda: 1234567890)
 
-        # Verify the response
-        assert response["statusCode"] == 200
-        response_body = json.loads(response["body"])
-        assert response_body["message"] == "Workout saved successfully"
+        # Verify the response; workoutIds keep the DATE#...#TIME# key
+        # shape with a time-ordered UUIDv7 suffix
+        response_body = _assert_ok(response)
         assert len(response_body["workoutIds"]) == 1
+        assert re.fullmatch(
+            r"DATE#\d{4}-\d{2}-\d{2}#TIME#"
+            r"[0-9a-f]{8}-[0-9a-f]{4}-7[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}",
+            response_body["workoutIds"][0])
 
         # Verify data was saved to DynamoDB
         saved_item = dynamodb_table.get_item(
@@ -103,25 +177,15 @@ class TestSubmitWorkout:
         assert saved_item["reps"] == 8
         assert saved_item["sets"] == 3
 
-    def test_lambda_handler_multiple_exercises(self, dynamodb_table, submit_workout_module):
+    def test_lambda_handler_multiple_exercises(self, dynamodb_table, submit_workout_module, base_event):
         """Test submission with multiple exercises."""
         # Prepare test event
         event = {
             "body": {
-                "userId": "test-user-123",
+                **base_event["body"],
                 "exercises": [
-                    {
-                        "name": "bench press",
-                        "weight": 135.5,
-                        "reps": 8,
-                        "sets": 3
-                    },
-                    {
-                        "name": "squat",
-                        "weight": 225.0,
-                        "reps": 5,
-                        "sets": 5
-                    }
+                    dict(_BASE_EXERCISE),
+                    {"name": "squat", "weight": 225.0, "reps": 5, "sets": 5}
                 ]
             }
         }
@@ -130,115 +194,58 @@ class TestSubmitWorkout:
         response = submit_workout_module.lambda_handler(event, None)
 
         # Verify the response
-        assert response["statusCode"] == 200
-        response_body = json.loads(response["body"])
-        assert response_body["message"] == "Workout saved successfully"
+        response_body = _assert_ok(response)
         assert len(response_body["workoutIds"]) == 2
 
-    def test_lambda_handler_invalid_exercise(self, submit_workout_module):
-        """Test submission with invalid exercise data."""
-        # Prepare test event
-        event = {
-            "body": {
-                "userId": "test-user-123",
-                "exercises": [
-                    {
-                        "name": "bench press",
-                        "weight": 135.5,
-                        "sets": 3
-                        # Missing reps
-                    }
-                ]
-            }
-        }
-
-        # Call the handler
-        response = submit_workout_module.lambda_handler(event, None)
+        # Both writes were coalesced into a single BatchWriteItem call
+        assert len(dynamodb_table.batch_calls) == 1
 
-        # Verify the response
-        assert response["statusCode"] == 400
-        response_body = json.loads(response["body"])
-        assert "Invalid exercise" in response_body["error"]
-
-    def test_lambda_handler_missing_user_id(self, submit_workout_module):
-        """Test submission with missing userId."""
-        # Prepare test event
-        event = {
-            "body": {
-                # Missing userId
-                "exercises": [
-                    {
-                        "name": "bench press",
-                        "weight": 135.5,
-                        "reps": 8,
-                        "sets": 3
-                    }
-                ]
-            }
-        }
-
-        # Call the handler
-        response = submit_workout_module.lambda_handler(event, None)
-
-        # Verify the response
-        assert response["statusCode"] == 400
-        response_body = json.loads(response["body"])
-        assert "userId is required" in response_body["error"]
-
-    def test_lambda_handler_empty_exercises(self, submit_workout_module):
-        """Test submission with empty exercises array."""
-        # Prepare test event
-        event = {
-            "body": {
-                "userId": "test-user-123",
-                "exercises": []
-            }
-        }
+    def test_lambda_handler_batches_at_25_items(self, dynamodb_table, submit_workout_module, base_event):
+        """Test that 26 exercises split into a 25-item batch plus a 1-item batch."""
+        # Prepare test event straddling the BatchWriteItem 25-item limit
+        exercises = [{**_BASE_EXERCISE, "name": f"exercise {i}"} for i in range(26)]
+        event = {"body": {**base_event["body"], "exercises": exercises}}
 
         # Call the handler
         response = submit_workout_module.lambda_handler(event, None)
 
-        # Verify the response
-        assert response["statusCode"] == 400
-        response_body = json.loads(response["body"])
-        assert "exercises must be a non-empty array" in response_body["error"]
-
-    def test_lambda_handler_string_body(self, dynamodb_table, submit_workout_module):
+        # Verify the response and the chunk boundary
+        assert len(_assert_ok(response)["workoutIds"]) == 26
+        chunk_sizes = [len(requests[FakeTable.name])
+                       for requests in dynamodb_table.batch_calls]
+        assert chunk_sizes == [25, 1]
+
+    @pytest.mark.parametrize("body,err_substr", [
+        # exercise missing reps
+        ({"userId": "test-user-123",
+          "exercises": [{k: v for k, v in _BASE_EXERCISE.items() if k != "reps"}]},
+         "Invalid exercise"),
+        # missing userId
+        ({"exercises": [dict(_BASE_EXERCISE)]}, "userId is required"),
+        # empty exercises array
+        ({"userId": "test-user-123", "exercises": []},
+         "exercises must be a non-empty array"),
+        # string body that is not JSON
+        ("this is not valid JSON", "Invalid JSON"),
+    ])
+    def test_lambda_handler_errors(self, submit_workout_module, body, err_substr):
+        """Test the handler's 400 paths with a table of bad requests.
+
+        The last case passes the body as a raw string so the handler's
+        JSON-parsing branch is the one that rejects it.
+        """
+        response = submit_workout_module.lambda_handler({"body": body}, None)
+
+        _assert_error(response, 400, err_substr)
+
+    @pytest.mark.usefixtures("dynamodb_table")
+    def test_lambda_handler_string_body(self, submit_workout_module):
         """Test handling of string body in the event."""
         # Prepare test event
-        event = {
-            "body": json.dumps({
-                "userId": "test-user-123",
-                "exercises": [
-                    {
-                        "name": "bench press",
-                        "weight": 135.5,
-                        "reps": 8,
-                        "sets": 3
-                    }
-                ]
-            })
-        }
-
-        # Call the handler
-        response = submit_workout_module.lambda_handler(event, None)
-
-        # Verify the response
-        assert response["statusCode"] == 200
-        response_body = json.loads(response["body"])
-        assert response_body["message"] == "Workout saved successfully"
-
-    def test_lambda_handler_invalid_json(self, submit_workout_module):
-        """Test handling of invalid JSON in the body."""
-        # Prepare test event
-        event = {
-            "body": "this is not valid JSON"
-        }
+        event = {"body": _VALID_BODY_JSON}
 
         # Call the handler
         response = submit_workout_module.lambda_handler(event, None)
 
         # Verify the response
-        assert response["statusCode"] == 400
-        response_body = json.loads(response["body"])
-        assert "Invalid JSON" in response_body["error"] 
\ No newline at end of file
+        _assert_ok(response) 
\ No newline at end of file